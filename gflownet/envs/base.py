@@ -943,16 +943,13 @@ class GFlowNetEnv:
         # interpretation is the same.
         if self.continuous:
             return env_cond.get_mask(backward=backward)
-        # Get valid actions common to both the original and the conditioning env
-        actions_valid_orig = self.get_valid_actions(mask)
-        actions_valid_cond = env_cond.get_valid_actions(backward=backward)
-        actions_valid = set(actions_valid_orig).intersection(set(actions_valid_cond))
         # Construct new mask by setting to False (valid or not invalid) the actions
-        # that are valid to both environments
-        mask = [True] * self.mask_dim
-        for action in actions_valid:
-            mask[self.action_space.index(action)] = False
-        return mask
+        # that are valid to both the original and the conditioning env
+        actions_valid_cond = set(env_cond.get_valid_actions(backward=backward))
+        return [
+            bool(m) or action not in actions_valid_cond
+            for action, m in zip(self.action_space, mask)
+        ]
 
     @torch.no_grad()
     def top_k_metrics_and_plots(
@@ -106,17 +106,6 @@ class LatticeParameters(ContinuousCube):
     def _angle2statevalue(self, angle):
         return (angle - self.min_angle) / self.angle_range
 
-    def _get_param(self, state, param):
-        if hasattr(self, param):
-            return getattr(self, param)
-        else:
-            if param in LENGTH_PARAMETER_NAMES:
-                return self._statevalue2length(state[self._get_index_of_param(param)])
-            elif param in ANGLE_PARAMETER_NAMES:
-                return self._statevalue2angle(state[self._get_index_of_param(param)])
-            else:
-                raise ValueError(f"{param} is not a valid lattice parameter")
-
     def _set_param(self, state, param, value):
         param_idx = self._get_index_of_param(param)
         if param_idx is not None:
@@ -218,6 +207,31 @@ class LatticeParameters(ContinuousCube):
         else:
             raise NotImplementedError
         self.ignored_dims = lengths_ignored_dims + angles_ignored_dims
+        # Index in the state of each length and index in the state or fixed value of
+        # each angle, so that the parameters can be unpacked without looking up
+        # attributes by name.
+        self._lengths_idx = (self.a_idx, self.b_idx, self.c_idx)
+        self._angles_idx_value = tuple(
+            (idx, getattr(self, angle) if idx is None else None)
+            for angle, idx in zip(
+                ANGLE_PARAMETER_NAMES, (self.alpha_idx, self.beta_idx, self.gamma_idx)
+            )
+        )
+        # Ignored dimensions to be updated after each step, together with the index of
+        # the dimension they are tied to or their fixed value in the state.
+        self._ignored_dims_idx_value = []
+        for idx, (param, is_ignored) in enumerate(
+            zip(PARAMETER_NAMES, self.ignored_dims)
+        ):
+            if not is_ignored:
+                continue
+            param_idx = self._get_index_of_param(param)
+            if param_idx is not None:
+                self._ignored_dims_idx_value.append((idx, param_idx, None))
+            else:
+                self._ignored_dims_idx_value.append(
+                    (idx, None, getattr(self, f"{param}_state"))
+                )
 
     def _step(
         self,
@@ -229,16 +243,8 @@ class LatticeParameters(ContinuousCube):
         after a call to the Cube's _step().
         """
         state, action, valid = super()._step(action, backward)
-        for idx, (param, is_ignored) in enumerate(
-            zip(PARAMETER_NAMES, self.ignored_dims)
-        ):
-            if not is_ignored:
-                continue
-            param_idx = self._get_index_of_param(param)
-            if param_idx is not None:
-                state[idx] = state[param_idx]
-            else:
-                state[idx] = getattr(self, f"{param}_state")
+        for idx, param_idx, value in self._ignored_dims_idx_value:
+            state[idx] = value if param_idx is None else state[param_idx]
         self.state = copy(state)
         return self.state, action, valid
 
@@ -252,10 +258,14 @@ class LatticeParameters(ContinuousCube):
         """
         state = self._get_state(state)
 
-        a, b, c, alpha, beta, gamma = [
-            self._get_param(state, p) for p in PARAMETER_NAMES
-        ]
-        return (a, b, c), (alpha, beta, gamma)
+        lengths = tuple(
+            self._statevalue2length(state[idx]) for idx in self._lengths_idx
+        )
+        angles = tuple(
+            value if idx is None else self._statevalue2angle(state[idx])
+            for idx, value in self._angles_idx_value
+        )
+        return lengths, angles
 
     def parameters2state(
         self, parameters: Tuple = None, lengths: Tuple = None, angles: Tuple = None
@@ -2,9 +2,10 @@
 Classes to represent crystal environments
 """
 
+import functools
 import itertools
-from copy import deepcopy
-from enum import Enum
+import re
+from enum import IntEnum
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple, Union
 
@@ -18,41 +19,65 @@ from gflownet.envs.base import GFlowNetEnv
 from gflownet.utils.common import tlong
 from gflownet.utils.crystals.pyxtal_cache import space_group_check_compatible
 
-CRYSTAL_LATTICE_SYSTEMS = None
-POINT_SYMMETRIES = None
-SPACE_GROUPS = None
+N_SPACE_GROUPS = 230
 
+# Regular expression to parse the readable representation of a state (see
+# SpaceGroup.state2readable), which captures the space group, the crystal-lattice
+# system index and the point symmetry index.
+_READABLE_PATTERN = re.compile(
+    r"^(\d+) \| [^|]* \| [^|]* \((\d+)\) \| [^|]* \((\d+)\) \|"
+)
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+def _load_yaml(filename: str) -> Dict:
+    with open(Path(__file__).parent / filename, "r") as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+@functools.lru_cache(maxsize=None)
 def _get_crystal_lattice_systems():
-    global CRYSTAL_LATTICE_SYSTEMS
-    if CRYSTAL_LATTICE_SYSTEMS is None:
-        with open(Path(__file__).parent / "crystal_lattice_systems.yaml", "r") as f:
-            CRYSTAL_LATTICE_SYSTEMS = yaml.safe_load(f)
-    return CRYSTAL_LATTICE_SYSTEMS
+    return _load_yaml("crystal_lattice_systems.yaml")
 
 
+@functools.lru_cache(maxsize=None)
 def _get_point_symmetries():
-    global POINT_SYMMETRIES
-    if POINT_SYMMETRIES is None:
-        with open(Path(__file__).parent / "point_symmetries.yaml", "r") as f:
-            POINT_SYMMETRIES = yaml.safe_load(f)
-    return POINT_SYMMETRIES
+    return _load_yaml("point_symmetries.yaml")
 
 
+@functools.lru_cache(maxsize=None)
 def _get_space_groups():
-    global SPACE_GROUPS
-    if SPACE_GROUPS is None:
-        with open(Path(__file__).parent / "space_groups.yaml", "r") as f:
-            SPACE_GROUPS = yaml.safe_load(f)
-    return SPACE_GROUPS
+    return _load_yaml("space_groups.yaml")
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_n_atoms_compatibility(
+    n_atoms: Tuple[int], space_groups: Tuple[int]
+) -> Tuple[bool]:
+    """
+    Returns a tuple indicating whether each space group in space_groups is compatible
+    with the stoichiometry n_atoms. The results are cached so that environments with
+    the same composition, such as the ones of a batch of Crystal trajectories, do not
+    need to check the compatibility again.
+
+    See: SpaceGroup.build_n_atoms_compatibility_dict()
+    """
+    return tuple(space_group_check_compatible(sg, list(n_atoms)) for sg in space_groups)
 
 
-class Prop(Enum):
+class Prop(IntEnum):
     """
     Enumeration of the 3 properties of the SpaceGroup Environment:
         - Crystal lattice system
         - Point symmetry
         - Space group
+
+    The values are the indices of the properties in the state, so that the members can
+    be used directly as integers.
     """
 
     CLS = 0
@@ -114,8 +139,27 @@ class SpaceGroup(GFlowNetEnv):
         self.point_symmetries = _get_point_symmetries()
         self.space_groups = _get_space_groups()
         self._restrict_space_groups(space_groups_subset)
-        # Set dictionary of compatibility with number of atoms
-        self.set_n_atoms_compatibility_dict(n_atoms)
+        # Boolean masks of the space groups of each crystal-lattice system and point
+        # symmetry, indexed by [property index, space group number]. Row 0 (property
+        # not set) contains all the space groups.
+        self.cls_space_groups_mask = self._build_space_groups_masks(
+            self.crystal_lattice_systems
+        )
+        self.ps_space_groups_mask = self._build_space_groups_masks(
+            self.point_symmetries
+        )
+        # Crystal-lattice system and point symmetry of each space group, as lists
+        # indexed by space group number, with 0 for the space groups not in the
+        # environment. Lists are used because they are faster to index with a single
+        # integer than both the dictionaries and NumPy arrays.
+        self.space_groups_cls = [0] * (N_SPACE_GROUPS + 1)
+        self.space_groups_ps = [0] * (N_SPACE_GROUPS + 1)
+        for sg, v in self.space_groups.items():
+            self.space_groups_cls[sg] = v["crystal_lattice_system_idx"]
+            self.space_groups_ps[sg] = v["point_symmetry_idx"]
+        # Arrays of indices of all crystal-lattice systems and point symmetries
+        self.cls_indices = np.array(list(self.crystal_lattice_systems), dtype=np.intp)
+        self.ps_indices = np.array(list(self.point_symmetries), dtype=np.intp)
         # Indices in the state representation: crystal-lattice system (cls), point
         # symmetry (ps) and space group (sg)
         self.cls_idx, self.ps_idx, self.sg_idx = 0, 1, 2
@@ -134,6 +178,43 @@ class SpaceGroup(GFlowNetEnv):
         self.source = [0 for _ in range(3)]
         # Base class init
         super().__init__(**kwargs)
+        # Array of all terminating states, one per space group, with the
+        # crystal-lattice system and point symmetry determined by the space group
+        self.terminating_states = np.array(
+            [
+                [v["crystal_lattice_system_idx"], v["point_symmetry_idx"], sg]
+                for sg, v in self.space_groups.items()
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        # Cache of readable representations of states (see state2readable)
+        self._readables_cache = {}
+        # Constant masks: all actions invalid (done) and only EOS valid (space group
+        # set)
+        self._mask_all_invalid = [True] * self.action_space_dim
+        self._mask_only_eos_valid = [True] * (self.action_space_dim - 1) + [False]
+        # Dictionary mapping actions to their index in the action space
+        self.action_to_index = {a: idx for idx, a in enumerate(self.action_space)}
+        # Array of the action space, with one action (property, index, state type)
+        # per row
+        self.action_space_array = np.array(self.action_space, dtype=np.intp)
+        # Array of action indices, indexed by [property, state type, property index].
+        # Entries that do not correspond to any action are -1.
+        self.action_indices = np.full(
+            (len(Prop), len(self.state_type_indices), N_SPACE_GROUPS + 1),
+            -1,
+            dtype=np.intp,
+        )
+        props, prop_indices, state_types = self.action_space_array[:-1].T
+        self.action_indices[props, state_types, prop_indices] = np.arange(
+            self.action_space_dim - 1
+        )
+        self.action_indices_torch = torch.from_numpy(self.action_indices).to(
+            self.device
+        )
+        # Set dictionary of compatibility with number of atoms, which also computes
+        # the forward masks and therefore requires the attributes above
+        self.set_n_atoms_compatibility_dict(n_atoms)
 
     def get_action_space(self):
         """
@@ -143,18 +224,44 @@ class SpaceGroup(GFlowNetEnv):
         set by the action and state_from_type is the state type of the originating
         state (see self.state_type_indices).
         """
-        actions = []
-        for prop, indices in self.properties.items():
-            for s_from_type in self.state_type_indices:
-                if prop == Prop.CLS and s_from_type in [1, 3]:
-                    continue
-                if prop == Prop.PS and s_from_type in [2, 3]:
-                    continue
-                actions_prop = [(prop.value, idx, s_from_type) for idx in indices]
-                actions += actions_prop
-        actions += [self.eos]
+        # State types from which each property can be set: the crystal-lattice system
+        # (point symmetry) can only be set if it is unset.
+        state_from_types = {
+            Prop.CLS: [0, 2],
+            Prop.PS: [0, 1],
+            Prop.SG: self.state_type_indices,
+        }
+        actions = [
+            (prop.value, idx, s_from_type)
+            for prop, indices in self.properties.items()
+            for s_from_type, idx in itertools.product(state_from_types[prop], indices)
+        ]
+        actions.append(self.eos)
         return actions
 
+    def action2index(self, action: Tuple) -> int:
+        """
+        Returns the index in the action space of the action passed as an argument, by
+        looking it up in self.action_to_index rather than scanning the action space.
+        """
+        return self.action_to_index[action]
+
+    def actions2indices(
+        self, actions: TensorType["batch_size", "action_dim"]
+    ) -> TensorType["batch_size"]:
+        """
+        Returns the corresponding indices in the action space of the actions in a
+        batch, by gathering them from self.action_indices_torch instead of comparing
+        each action with the whole action space.
+        """
+        actions = tlong(actions, device=self.device)
+        is_eos = actions[:, 0] == self.eos[0]
+        # EOS entries (-1) are clamped to a valid position and overwritten below
+        actions = actions.clamp(min=0)
+        indices = self.action_indices_torch[actions[:, 0], actions[:, 2], actions[:, 1]]
+        indices[is_eos] = self.action_space_dim - 1
+        return indices
+
     def get_mask_invalid_actions_forward(
         self,
         state: Optional[List] = None,
@@ -164,87 +271,81 @@ class SpaceGroup(GFlowNetEnv):
         Returns a list of length the action space with values:
             - True if the forward action is invalid given the current state.
             - False otherwise.
+
+        The masks of done states and states with the space group set are constant.
+        Otherwise, the mask only depends on the crystal-lattice system, the point
+        symmetry and the constraints fixed at initialization or by
+        set_n_atoms_compatibility_dict(). Therefore, the masks of all the pairs of
+        crystal-lattice system and point symmetry are precomputed as an array by
+        set_n_atoms_compatibility_dict() (self.masks_forward) and the lists returned
+        are stored in self._masks_forward_cache.
         """
         if state is None:
-            state = self.state.copy()
+            state = self.state
         if done is None:
             done = self.done
+        return self._get_mask_invalid_actions_forward(state, done).copy()
+
+    def _get_mask_invalid_actions_forward(self, state: List, done: bool) -> List:
+        """
+        Returns the forward mask of invalid actions of a state without copying it.
+        The returned list is shared across calls and must not be modified.
+
+        See: get_mask_invalid_actions_forward()
+        """
         if done:
-            return [True for _ in self.action_space]
-        cls_idx, ps_idx, sg_idx = state
+            return self._mask_all_invalid
         # If space group has been selected, only valid action is EOS
-        if sg_idx != 0:
-            mask = [True for _ in self.action_space]
-            mask[-1] = False
-            return mask
-        state_type = self.get_state_type(state)
-        # If neither crystal-lattice system nor point symmetry selected, apply only
-        # composition-compatibility constraints
-        if cls_idx == 0 and ps_idx == 0:
-            crystal_lattice_systems = [
-                (self.cls_idx, idx, state_type)
-                for idx in self.crystal_lattice_systems
-                if self._is_compatible(cls_idx=idx)
-            ]
-            point_symmetries = [
-                (self.ps_idx, idx, state_type)
-                for idx in self.point_symmetries
-                if self._is_compatible(ps_idx=idx)
-            ]
-        # Constraints after having selected crystal-lattice system
-        if cls_idx != 0:
-            crystal_lattice_systems = []
-            space_groups_cls = [
-                (self.sg_idx, sg, state_type)
-                for sg in self.crystal_lattice_systems[cls_idx]["space_groups"]
-                if self.n_atoms_compatibility_dict[sg]
-            ]
-            # If no point symmetry selected yet
-            if ps_idx == 0:
-                point_symmetries = [
-                    (self.ps_idx, idx, state_type)
-                    for idx in self.crystal_lattice_systems[cls_idx]["point_symmetries"]
-                    if self._is_compatible(cls_idx=cls_idx, ps_idx=idx)
-                ]
-        else:
-            space_groups_cls = [
-                (self.sg_idx, idx, state_type)
-                for idx in self.space_groups
-                if self.n_atoms_compatibility_dict[idx]
-            ]
-        # Constraints after having selected point symmetry
-        if ps_idx != 0:
-            point_symmetries = []
-            space_groups_ps = [
-                (self.sg_idx, sg, state_type)
-                for sg in self.point_symmetries[ps_idx]["space_groups"]
-                if self.n_atoms_compatibility_dict[sg]
-            ]
-            # If no crystal-lattice system selected yet
-            if cls_idx == 0:
-                crystal_lattice_systems = [
-                    (self.cls_idx, idx, state_type)
-                    for idx in self.point_symmetries[ps_idx]["crystal_lattice_systems"]
-                    if self._is_compatible(cls_idx=idx, ps_idx=ps_idx)
-                ]
-        else:
-            space_groups_ps = [
-                (self.sg_idx, idx, state_type)
-                for idx in self.space_groups
-                if self.n_atoms_compatibility_dict[idx]
-            ]
-        # Merge space_groups constraints and determine valid space group actions
-        space_groups = list(set(space_groups_cls).intersection(set(space_groups_ps)))
-        # Construct mask
-        actions_valid = set.union(
-            set(crystal_lattice_systems), set(point_symmetries), set(space_groups)
-        )
-        assert len(actions_valid) > 0
-        mask = [
-            False if action in actions_valid else True for action in self.action_space
-        ]
+        if state[self.sg_idx] != 0:
+            return self._mask_only_eos_valid
+        # The space group is not set, so the mask is determined by the crystal-lattice
+        # system and the point symmetry
+        key = (state[self.cls_idx], state[self.ps_idx])
+        mask = self._masks_forward_cache.get(key)
+        if mask is None:
+            mask = self.masks_forward[key]
+            assert not mask.all()
+            # The mask is returned as a list, as expected by the base environment and
+            # the Stack environment, which concatenates the masks of its
+            # sub-environments.
+            mask = mask.tolist()
+            self._masks_forward_cache[key] = mask
         return mask
 
+    def _compute_masks_invalid_actions_forward(self) -> np.ndarray:
+        """
+        Computes the forward masks of invalid actions of all the states that are not
+        done and in which the space group is not set. The masks are returned as a
+        boolean array indexed by [crystal-lattice system, point symmetry, action].
+
+        See: get_mask_invalid_actions_forward()
+        """
+        n_cls, n_ps, _ = self.n_atoms_compatible_space_groups.shape
+        state_types = (np.arange(n_cls)[:, None] > 0) | ((np.arange(n_ps) > 0) << 1)
+        # Boolean array indexed by [property, crystal-lattice system, point symmetry,
+        # property index], which is True if setting the property index is valid.
+        valid = np.zeros((len(Prop), n_cls, n_ps, N_SPACE_GROUPS + 1), dtype=bool)
+        # Valid space groups: those compatible with the composition and the properties
+        # already set
+        valid[Prop.SG] = self.n_atoms_compatible_space_groups
+        # Valid crystal-lattice systems (point symmetries): none if already set, or
+        # else those with at least one space group compatible with the composition and
+        # the point symmetry (crystal-lattice system), if set.
+        valid[Prop.CLS, 0][:, self.cls_indices] = self.n_atoms_compatibility_table[
+            self.cls_indices
+        ].T
+        valid[Prop.PS][:, 0][:, self.ps_indices] = self.n_atoms_compatibility_table[
+            :, self.ps_indices
+        ]
+        # Construct masks by setting to False the indices of the valid actions
+        props, cls_indices, ps_indices, indices = np.nonzero(valid)
+        action_indices = self.action_indices[
+            props, state_types[cls_indices, ps_indices], indices
+        ]
+        masks = np.ones((n_cls, n_ps, self.action_space_dim), dtype=bool)
+        masks[cls_indices, ps_indices, action_indices] = False
+        return masks
+
     def states2proxy(
         self, states: Union[List[List], TensorType["batch", "state_dim"]]
     ) -> TensorType["batch", "state_proxy_dim"]:
@@ -262,8 +363,16 @@ class SpaceGroup(GFlowNetEnv):
         -------
         A tensor containing all the states in the batch.
         """
+        # If the states are a tensor, slice the space group column as a [batch, 1] view,
+        # which is only copied if the dtype or device do not match
+        if torch.is_tensor(states):
+            return tlong(states[:, self.sg_idx : self.sg_idx + 1], device=self.device)
+        # If the states are a list of lists, build only the space group column instead
+        # of the tensor of full states
+        if not torch.is_tensor(states[0]):
+            return tlong([[state[self.sg_idx]] for state in states], device=self.device)
         states = tlong(states, device=self.device)
-        return torch.unsqueeze(states[:, self.sg_idx], dim=1)
+        return states[:, self.sg_idx : self.sg_idx + 1]
 
     def state2readable(self, state=None):
         """
@@ -288,16 +397,43 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        cls_idx, ps_idx, sg_idx = state
-        crystal_lattice_system = self.get_crystal_lattice_system(state)
-        point_symmetry = self.get_point_symmetry(state)
-        sg_symbol = self.get_space_group_symbol(state)
-        crystal_class = self.get_crystal_class(state)
-        point_group = self.get_point_group(state)
+        key = tuple(state)
+        readable = self._readables_cache.get(key)
+        if readable is not None:
+            return readable
+        cls_idx, ps_idx, sg_idx = key
+        # The crystal-lattice system and point symmetry names are determined by the
+        # space group, if it is set. See: _set_constrained_properties()
+        space_group = self.space_groups.get(sg_idx) if sg_idx != 0 else None
+        if space_group is not None:
+            cls = space_group["crystal_lattice_system_idx"] if cls_idx == 0 else cls_idx
+            ps = space_group["point_symmetry_idx"] if ps_idx == 0 else ps_idx
+        else:
+            cls, ps = cls_idx, ps_idx
+        if cls != 0:
+            crystal_system = self.crystal_lattice_systems[cls]["crystal_system"]
+            lattice_system = self.crystal_lattice_systems[cls]["lattice_system"]
+        else:
+            crystal_system, lattice_system = "None", "None"
+        if crystal_system != lattice_system:
+            crystal_lattice_system = f"{crystal_system}-{lattice_system}"
+        else:
+            crystal_lattice_system = crystal_system
+        if ps != 0:
+            point_symmetry = self.point_symmetries[ps]["point_symmetry"]
+        else:
+            point_symmetry = "None"
+        if space_group is not None:
+            sg_symbol = space_group["full_symbol"]
+            crystal_class = space_group["crystal_class"]
+            point_group = space_group["point_group"]
+        else:
+            sg_symbol, crystal_class, point_group = "None", "None", "None"
         readable = (
             f"{sg_idx} | {sg_symbol} | {crystal_lattice_system} ({cls_idx}) | "
             + f"{point_symmetry} ({ps_idx}) | {crystal_class} | {point_group}"
         )
+        self._readables_cache[key] = readable
         return readable
 
     def readable2state(self, readable):
@@ -305,11 +441,10 @@ class SpaceGroup(GFlowNetEnv):
         Converts a human-readable representation of a state into the standard format.
         See: state2readable
         """
-        properties = readable.split(" | ")
-        space_group = int(properties[0])
-        crystal_lattice_system = int(properties[2].split(" ")[-1].strip("(").strip(")"))
-        point_symmetry = int(properties[3].split(" ")[-1].strip("(").strip(")"))
-        state = [crystal_lattice_system, point_symmetry, space_group]
+        space_group, crystal_lattice_system, point_symmetry = _READABLE_PATTERN.match(
+            readable
+        ).groups()
+        state = [int(crystal_lattice_system), int(point_symmetry), int(space_group)]
         return state
 
     def get_parents(self, state=None, done=None, action=None):
@@ -334,45 +469,49 @@ class SpaceGroup(GFlowNetEnv):
         actions : list
             List of actions that lead to state for each parent in parents
         """
+        # The state is only read, except in the done case, where it is returned as its
+        # own parent and is therefore copied.
         if state is None:
-            state = self.state.copy()
+            state = self.state
         if done is None:
             done = self.done
         if done:
-            return [state], [self.eos]
-        else:
-            parents = []
-            actions = []
-            # Catch cases where space group has been selected
-            if state[self.sg_idx] != 0:
-                sg = state[self.sg_idx]
-                # Add parent: source
-                parents.append(self.source)
-                action = (self.sg_idx, sg, 0)
-                actions.append(action)
-                # Add parents: states before setting space group
-                state_pre_sg = state.copy()
-                state_pre_sg[self.sg_idx] = 0
-                for prop in range(len(state_pre_sg)):
-                    parent = state_pre_sg.copy()
-                    parent[prop] = 0
-                    parents.append(parent)
-                    parent_type = self.get_state_type(parent)
-                    action = (self.sg_idx, sg, parent_type)
-                    actions.append(action)
-            else:
-                # Catch other parents
-                for prop, idx in enumerate(state[: self.sg_idx]):
-                    if idx != 0:
-                        parent = state.copy()
-                        parent[prop] = 0
-                        parents.append(parent)
-                        parent_type = self.get_state_type(parent)
-                        action = (prop, idx, parent_type)
-                        actions.append(action)
+            return [state.copy()], [self.eos]
+        cls_idx, ps_idx, sg_idx = state
+        # State types of the parents with the point symmetry unset (cls_type) and
+        # with the crystal-lattice system unset (ps_type). See: get_state_type()
+        cls_type = int(cls_idx > 0)
+        ps_type = 2 * int(ps_idx > 0)
+        # Catch cases where space group has been selected
+        if sg_idx != 0:
+            # Parents: source and states before setting space group
+            parents = [
+                [0, 0, 0],
+                [0, ps_idx, 0],
+                [cls_idx, 0, 0],
+                [cls_idx, ps_idx, 0],
+            ]
+            actions = [
+                (self.sg_idx, sg_idx, 0),
+                (self.sg_idx, sg_idx, ps_type),
+                (self.sg_idx, sg_idx, cls_type),
+                (self.sg_idx, sg_idx, cls_type + ps_type),
+            ]
+            return parents, actions
+        # Catch other parents
+        parents = []
+        actions = []
+        if cls_idx != 0:
+            parents.append([0, ps_idx, 0])
+            actions.append((self.cls_idx, cls_idx, ps_type))
+        if ps_idx != 0:
+            parents.append([cls_idx, 0, 0])
+            actions.append((self.ps_idx, ps_idx, cls_type))
         return parents, actions
 
-    def step(self, action: Tuple[int, int]) -> Tuple[List[int], Tuple[int, int], bool]:
+    def step(
+        self, action: Tuple[int, int], skip_mask_check: bool = False
+    ) -> Tuple[List[int], Tuple[int, int], bool]:
         """
         Executes step given an action.
 
@@ -381,6 +520,10 @@ class SpaceGroup(GFlowNetEnv):
         action : tuple
             Action to be executed. See: get_action_space()
 
+        skip_mask_check : bool
+            If True, skip checking the forward mask of invalid actions to check if the
+            action is valid.
+
         Returns
         -------
         self.state : list
@@ -393,15 +536,18 @@ class SpaceGroup(GFlowNetEnv):
             False, if the action is not allowed for the current state.
         """
         # If action not found in action space raise an error
-        if action not in self.action_space:
+        action_idx = self.action_to_index.get(action)
+        if action_idx is None:
             raise ValueError(
                 f"Tried to execute action {action} not present in action space."
             )
-        else:
-            action_idx = self.action_space.index(action)
-        # If action is in invalid mask, exit immediately
-        if self.get_mask_invalid_actions_forward()[action_idx]:
+        # If env is done, exit immediately
+        if self.done:
             return self.state, action, False
+        # If action is in invalid mask, exit immediately
+        if not (self.skip_mask_check or skip_mask_check):
+            if self._get_mask_invalid_actions_forward(self.state, False)[action_idx]:
+                return self.state, action, False
         valid = True
         self.n_actions += 1
         prop, idx, _ = action
@@ -436,17 +582,13 @@ class SpaceGroup(GFlowNetEnv):
             The updated state.
         """
         cls_idx, ps_idx, sg_idx = state
-        if sg_idx != 0:
-            if sg_idx not in self.space_groups:
-                return state
+        # Space groups not in the environment have 0 in self.space_groups_cls and
+        # self.space_groups_ps, so the state is left unchanged.
+        if 0 < sg_idx <= N_SPACE_GROUPS:
             if cls_idx == 0:
-                state[self.cls_idx] = self.space_groups[state[self.sg_idx]][
-                    "crystal_lattice_system_idx"
-                ]
+                state[self.cls_idx] = self.space_groups_cls[sg_idx]
             if ps_idx == 0:
-                state[self.ps_idx] = self.space_groups[state[self.sg_idx]][
-                    "point_symmetry_idx"
-                ]
+                state[self.ps_idx] = self.space_groups_ps[sg_idx]
         return state
 
     def get_crystal_system(self, state: List[int] = None) -> str:
@@ -455,9 +597,9 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        state = self._set_constrained_properties(state)
-        if state[self.cls_idx] != 0:
-            return self.crystal_lattice_systems[state[self.cls_idx]]["crystal_system"]
+        cls_idx = self._set_constrained_properties(state)[self.cls_idx]
+        if cls_idx != 0:
+            return self.crystal_lattice_systems[cls_idx]["crystal_system"]
         else:
             return "None"
 
@@ -471,9 +613,9 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        state = self._set_constrained_properties(state)
-        if state[self.cls_idx] != 0:
-            return self.crystal_lattice_systems[state[self.cls_idx]]["lattice_system"]
+        cls_idx = self._set_constrained_properties(state)[self.cls_idx]
+        if cls_idx != 0:
+            return self.crystal_lattice_systems[cls_idx]["lattice_system"]
         else:
             return "None"
 
@@ -504,9 +646,9 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        state = self._set_constrained_properties(state)
-        if state[self.ps_idx] != 0:
-            return self.point_symmetries[state[self.ps_idx]]["point_symmetry"]
+        ps_idx = self._set_constrained_properties(state)[self.ps_idx]
+        if ps_idx != 0:
+            return self.point_symmetries[ps_idx]["point_symmetry"]
         else:
             return "None"
 
@@ -520,8 +662,9 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        if state[self.sg_idx] != 0:
-            return self.space_groups[state[self.sg_idx]]["full_symbol"]
+        sg_idx = state[self.sg_idx]
+        if sg_idx != 0:
+            return self.space_groups[sg_idx]["full_symbol"]
         else:
             return "None"
 
@@ -535,8 +678,9 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        if state[self.sg_idx] != 0:
-            return state[self.sg_idx]
+        sg_idx = state[self.sg_idx]
+        if sg_idx != 0:
+            return sg_idx
         else:
             return None
 
@@ -552,8 +696,9 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        if state[self.sg_idx] != 0:
-            return self.space_groups[state[self.sg_idx]]["crystal_class"]
+        sg_idx = state[self.sg_idx]
+        if sg_idx != 0:
+            return self.space_groups[sg_idx]["crystal_class"]
         else:
             return "None"
 
@@ -569,8 +714,9 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        if state[self.sg_idx] != 0:
-            return self.space_groups[state[self.sg_idx]]["point_group"]
+        sg_idx = state[self.sg_idx]
+        if sg_idx != 0:
+            return self.space_groups[sg_idx]["point_group"]
         else:
             return "None"
 
@@ -589,7 +735,7 @@ class SpaceGroup(GFlowNetEnv):
         """
         if state is None:
             state = self.state
-        return sum([int(s > 0) * f for s, f in zip(state, (1, 2))])
+        return (state[self.cls_idx] > 0) | ((state[self.ps_idx] > 0) << 1)
 
     def set_n_atoms_compatibility_dict(self, n_atoms: List):
         """
@@ -611,6 +757,33 @@ class SpaceGroup(GFlowNetEnv):
         self.n_atoms_compatibility_dict = SpaceGroup.build_n_atoms_compatibility_dict(
             n_atoms, self.space_groups.keys()
         )
+        # Boolean mask of compatible space groups, indexed by space group number
+        self.n_atoms_compatibility_mask = self._space_groups_to_mask(
+            [
+                sg
+                for sg, is_compatible in self.n_atoms_compatibility_dict.items()
+                if is_compatible
+            ]
+        )
+        # Boolean array indexed by [crystal-lattice system, point symmetry, space
+        # group], which is True if the space group is compatible with the composition
+        # and belongs to both properties. Index 0 stands for the property not being
+        # set.
+        self.n_atoms_compatible_space_groups = (
+            self.cls_space_groups_mask[:, None, :]
+            & self.ps_space_groups_mask[None, :, :]
+            & self.n_atoms_compatibility_mask
+        )
+        # Boolean table indexed by [crystal-lattice system, point symmetry], which is
+        # True if at least one space group is compatible with the composition and
+        # both properties.
+        self.n_atoms_compatibility_table = np.any(
+            self.n_atoms_compatible_space_groups, axis=2
+        )
+        # Forward masks of the states with the space group unset, which are converted
+        # into lists on demand by _get_mask_invalid_actions_forward()
+        self.masks_forward = self._compute_masks_invalid_actions_forward()
+        self._masks_forward_cache = {}
 
     def _is_compatible(
         self, cls_idx: Optional[int] = None, ps_idx: Optional[int] = None
@@ -621,24 +794,35 @@ class SpaceGroup(GFlowNetEnv):
         crystal-lattice system (if provided), and with the point symmetry (if provided).
         False otherwise.
         """
-        # Get list of space groups compatible with the composition
-        space_groups = [
-            sg for sg in self.space_groups if self.n_atoms_compatibility_dict[sg]
-        ]
-
-        # Prune the list of space groups to those compatible with the provided crystal-
-        # lattice system
-        if cls_idx is not None:
-            space_groups_cls = self.crystal_lattice_systems[cls_idx]["space_groups"]
-            space_groups = list(set(space_groups).intersection(set(space_groups_cls)))
+        if cls_idx is None:
+            cls_idx = 0
+        if ps_idx is None:
+            ps_idx = 0
+        return bool(self.n_atoms_compatibility_table[cls_idx, ps_idx])
 
-        # Prune the list of space groups to those compatible with the provided point
-        # symmetry
-        if ps_idx is not None:
-            space_groups_ps = self.point_symmetries[ps_idx]["space_groups"]
-            space_groups = list(set(space_groups).intersection(set(space_groups_ps)))
+    def _build_space_groups_masks(self, properties: Dict) -> np.ndarray:
+        """
+        Returns a 2D boolean array indexed by [property index, space group number],
+        which is True if the space group belongs to the property (crystal-lattice
+        system or point symmetry) and False otherwise. Row 0 (property not set) is True
+        for all the space groups of the environment.
+        """
+        masks = np.zeros((max(properties) + 1, N_SPACE_GROUPS + 1), dtype=bool)
+        masks[0] = self._space_groups_to_mask(self.space_groups)
+        for idx, v in properties.items():
+            masks[idx] = self._space_groups_to_mask(v["space_groups"])
+        return masks
 
-        return len(space_groups) > 0
+    @staticmethod
+    def _space_groups_to_mask(space_groups: Iterable[int]) -> np.ndarray:
+        """
+        Returns a boolean array of length N_SPACE_GROUPS + 1, indexed by space group
+        number, which is True for the space groups in space_groups and False
+        otherwise. Index 0 (no space group) is always False.
+        """
+        mask = np.zeros(N_SPACE_GROUPS + 1, dtype=bool)
+        mask[list(space_groups)] = True
+        return mask
 
     @staticmethod
     def build_n_atoms_compatibility_dict(
@@ -672,8 +856,10 @@ class SpaceGroup(GFlowNetEnv):
             return {sg: True for sg in space_groups}
         n_atoms = [n for n in n_atoms if n > 0]
         assert all([n > 0 for n in n_atoms])
+        space_groups = tuple(space_groups)
         assert all([sg > 0 and sg <= 230 for sg in space_groups])
-        return {sg: space_group_check_compatible(sg, n_atoms) for sg in space_groups}
+        is_compatible = _get_n_atoms_compatibility(tuple(sorted(n_atoms)), space_groups)
+        return dict(zip(space_groups, is_compatible))
 
     def _restrict_space_groups(self, sg_subset: Optional[Iterable] = None):
         """
@@ -693,68 +879,49 @@ class SpaceGroup(GFlowNetEnv):
             k: v for (k, v) in self.space_groups.items() if k in sg_subset
         }
 
-        # Update self.crystal_lattice_systems based on space groups
-        self.crystal_lattice_systems = deepcopy(self.crystal_lattice_systems)
-        cls_to_remove = []
-        for cls in self.crystal_lattice_systems:
-            cls_space_groups = sg_subset.intersection(
-                set(self.crystal_lattice_systems[cls]["space_groups"])
-            )
-            if len(cls_space_groups) == 0:
-                cls_to_remove.append(cls)
-            else:
-                self.crystal_lattice_systems[cls]["space_groups"] = list(
-                    cls_space_groups
-                )
-        for cls in cls_to_remove:
-            del self.crystal_lattice_systems[cls]
-
-        # Update self.point_symmetries based on space groups
-        self.point_symmetries = deepcopy(self.point_symmetries)
-        ps_to_remove = []
-        for ps in self.point_symmetries:
-            ps_space_groups = sg_subset.intersection(
-                set(self.point_symmetries[ps]["space_groups"])
-            )
-            if len(ps_space_groups) == 0:
-                ps_to_remove.append(ps)
-            else:
-                self.point_symmetries[ps]["space_groups"] = list(ps_space_groups)
-        for ps in ps_to_remove:
-            del self.point_symmetries[ps]
+        # Update self.crystal_lattice_systems and self.point_symmetries based on space
+        # groups. New dictionaries are built for the updated entries, so that the
+        # dictionaries loaded from the YAML files are not modified.
+        self.crystal_lattice_systems = {
+            cls: {
+                **v,
+                "space_groups": [sg for sg in v["space_groups"] if sg in sg_subset],
+            }
+            for cls, v in self.crystal_lattice_systems.items()
+            if not sg_subset.isdisjoint(v["space_groups"])
+        }
+        self.point_symmetries = {
+            ps: {
+                **v,
+                "space_groups": [sg for sg in v["space_groups"] if sg in sg_subset],
+            }
+            for ps, v in self.point_symmetries.items()
+            if not sg_subset.isdisjoint(v["space_groups"])
+        }
 
         # Update point symmetries of remaining crystal lattice systems
-        point_symmetries = set(self.point_symmetries)
-        for cls in self.crystal_lattice_systems:
-            cls_point_symmetries = point_symmetries.intersection(
-                set(self.crystal_lattice_systems[cls]["point_symmetries"])
-            )
-            self.crystal_lattice_systems[cls]["point_symmetries"] = list(
-                cls_point_symmetries
-            )
+        for v in self.crystal_lattice_systems.values():
+            v["point_symmetries"] = [
+                ps for ps in v["point_symmetries"] if ps in self.point_symmetries
+            ]
 
         # Update crystal lattice systems of remaining point symmetries
-        crystal_lattice_systems = set(self.crystal_lattice_systems)
-        for ps in self.point_symmetries:
-            ps_crystal_lattice_systems = crystal_lattice_systems.intersection(
-                set(self.point_symmetries[ps]["crystal_lattice_systems"])
-            )
-            self.point_symmetries[ps]["crystal_lattice_systems"] = list(
-                ps_crystal_lattice_systems
-            )
+        for v in self.point_symmetries.values():
+            v["crystal_lattice_systems"] = [
+                cls
+                for cls in v["crystal_lattice_systems"]
+                if cls in self.crystal_lattice_systems
+            ]
 
     def get_all_terminating_states(
         self, apply_stoichiometry_constraints: Optional[bool] = True
     ) -> List[List]:
-        all_x = []
-        for sg in self.space_groups:
-            if (
-                apply_stoichiometry_constraints
-                and self.n_atoms_compatibility_dict[sg] is False
-            ):
-                continue
-            all_x.append(self._set_constrained_properties([0, 0, sg]))
-        return all_x
+        if apply_stoichiometry_constraints:
+            is_compatible = self.n_atoms_compatibility_mask[
+                self.terminating_states[:, self.sg_idx]
+            ]
+            return self.terminating_states[is_compatible].tolist()
+        return self.terminating_states.tolist()
 
     def is_valid(self, x: List) -> bool:
         """
@@ -280,7 +280,7 @@ class ContinuousTorus(HybridTorus):
                 actions_bts = states_from_angles - source_angles
                 actions_tensor[do_bts] = actions_bts
         # TODO: is this too inefficient because of the multiple data transfers?
-        actions = [tuple(a.tolist()) for a in actions_tensor]
+        actions = [tuple(a) for a in actions_tensor.tolist()]
         return actions, logprobs
 
     def get_logprobs(
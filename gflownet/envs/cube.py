@@ -2,7 +2,6 @@
 Classes to represent hyper-cube environments
 """
 
-import itertools
 import warnings
 from abc import ABC, abstractmethod
 from typing import List, Optional, Tuple, Union
@@ -10,12 +9,13 @@ from typing import List, Optional, Tuple, Union
 import matplotlib.pyplot as plt
 import numpy as np
 import torch
+import torch.nn.functional as F
 from sklearn.neighbors import KernelDensity
-from torch.distributions import Bernoulli, Beta, Categorical, MixtureSameFamily
+from torch.distributions import Beta, Categorical, MixtureSameFamily
 from torchtyping import TensorType
 
 from gflownet.envs.base import GFlowNetEnv
-from gflownet.utils.common import copy, tbool, tfloat, torch2np
+from gflownet.utils.common import tfloat, torch2np
 
 CELL_MIN = -1.0
 CELL_MAX = 1.0
@@ -293,7 +293,9 @@ class CubeBase(GFlowNetEnv, ABC):
         return torch.logit((param_value - self.beta_params_min) / self.beta_params_max)
 
     def _get_effective_dims(self, state: Optional[List] = None) -> List:
-        state = self._get_state(state)
+        # The state is only read, so self.state is not copied if state is None
+        if state is None:
+            state = self.state
         return [s for s, ign_dim in zip(state, self.ignored_dims) if not ign_dim]
 
 
@@ -333,6 +335,9 @@ class ContinuousCube(CubeBase):
         # Mask dimensionality: 3 + number of dimensions
         self.mask_dim_base = 3
         self.mask_dim = self.mask_dim_base + self.n_dim
+        # EOS action as a tensor, to be compared against or written into batches of
+        # actions
+        self.eos_tensor = tfloat(self.eos, float_type=self.float, device=self.device)
 
     def get_action_space(self):
         """
@@ -515,22 +520,23 @@ class ContinuousCube(CubeBase):
           multiple dimensions coupled or fixed. For each dimension, True if ignored,
           False, otherwise.
         """
-        state = self._get_state(state)
         done = self._get_done(done)
         # If done, the entire mask is True (all actions are "invalid" and no special
         # cases)
         if done:
             return [True] * self.mask_dim
         mask = [False] * self.mask_dim_base + self.ignored_dims
+        effective_dims = self._get_effective_dims(state)
         # If the state is the source state, EOS is invalid
-        if self._get_effective_dims(state) == self._get_effective_dims(self.source):
+        if effective_dims == self._get_effective_dims(self.source):
             mask[2] = True
         # If the state is not the source, indicate not special case (True)
         else:
             mask[1] = True
         # If the value of any dimension is greater than 1 - min_incr, then continuous
         # actions are invalid (True).
-        if any([s > 1 - self.min_incr for s in self._get_effective_dims(state)]):
+        max_value = 1 - self.min_incr
+        if any(s > max_value for s in effective_dims):
             mask[0] = True
         return mask
 
@@ -559,11 +565,11 @@ class ContinuousCube(CubeBase):
           multiple dimensions coupled or fixed. for each dimension, true if ignored,
           false, otherwise. By default, no dimension is ignored.
         """
-        state = self._get_state(state)
         done = self._get_done(done)
         mask = [True] * self.mask_dim_base + self.ignored_dims
+        effective_dims = self._get_effective_dims(state)
         # If the state is the source state, entire mask is True
-        if self._get_effective_dims(state) == self._get_effective_dims(self.source):
+        if effective_dims == self._get_effective_dims(self.source):
             return mask
         # If done, only valid action is EOS.
         if done:
@@ -571,7 +577,7 @@ class ContinuousCube(CubeBase):
             return mask
         # If any dimension is smaller than m, then back-to-source action is the only
         # possible actiona.
-        if any([s < self.min_incr for s in self._get_effective_dims(state)]):
+        if any(s < self.min_incr for s in effective_dims):
             mask[1] = False
             return mask
         # Otherwise, continuous actions are valid
@@ -608,13 +614,10 @@ class ContinuousCube(CubeBase):
 
         a = m + r * (x - m)
         """
-        min_increments = torch.full_like(
-            increments_rel, self.min_incr, dtype=self.float, device=self.device
-        )
         if is_backward:
-            return min_increments + increments_rel * (states - min_increments)
+            return self.min_incr + increments_rel * (states - self.min_incr)
         else:
-            return min_increments + increments_rel * (1.0 - states - min_increments)
+            return self.min_incr + increments_rel * (1.0 - states - self.min_incr)
 
     def absolute_to_relative_increments(
         self,
@@ -637,21 +640,16 @@ class ContinuousCube(CubeBase):
 
         r = (a - m) / (x - m)
         """
-        min_increments = torch.full_like(
-            increments_abs, self.min_incr, dtype=self.float, device=self.device
-        )
         if is_backward:
-            increments_rel = (increments_abs - min_increments) / (
-                states - min_increments
-            )
+            increments_rel = (increments_abs - self.min_incr) / (states - self.min_incr)
             # Add epsilon to numerator and denominator if values are unbounded
             if not torch.all(torch.isfinite(increments_rel)):
-                increments_rel = (increments_abs - min_increments + 1e-9) / (
-                    states - min_increments + 1e-9
+                increments_rel = (increments_abs - self.min_incr + 1e-9) / (
+                    states - self.min_incr + 1e-9
                 )
             return increments_rel
         else:
-            return (increments_abs - min_increments) / (1.0 - states - min_increments)
+            return (increments_abs - self.min_incr) / (1.0 - states - self.min_incr)
 
     @staticmethod
     def _get_beta_params_from_mean_variance(
@@ -693,19 +691,34 @@ class ContinuousCube(CubeBase):
     def _make_increments_distribution(
         self,
         policy_outputs: TensorType["n_states", "policy_output_dim"],
-    ) -> MixtureSameFamily:
-        mix_logits = self._get_policy_betas_weights(policy_outputs).reshape(
-            -1, self.n_dim, self.n_comp
+    ) -> Union[Beta, MixtureSameFamily]:
+        """
+        Builds the distribution of the relative increments of a batch of policy
+        outputs: a mixture of n_comp Beta distributions per dimension or, if n_comp is
+        1, simply a Beta distribution per dimension, which is equivalent but cheaper to
+        build and sample from.
+
+        See: get_policy_output()
+        """
+        # The weights, pre-alphas and pre-betas of the mixture are interleaved in the
+        # continuous part of the policy output (see get_policy_output()), so they are
+        # obtained at once by reshaping it into [n_states, n_dim, n_comp, 3].
+        mix_logits, alphas, betas = (
+            policy_outputs[:, : self._len_policy_output_cont]
+            .reshape(-1, self.n_dim, self.n_comp, 3)
+            .unbind(dim=-1)
         )
-        mix = Categorical(logits=mix_logits)
-        alphas = self._get_policy_betas_alpha(policy_outputs).reshape(
-            -1, self.n_dim, self.n_comp
+        # The addition is done in place on the output of the multiplication, which is
+        # not needed by autograd, to avoid allocating one more tensor per parameter.
+        alphas = (
+            torch.sigmoid(alphas).mul(self.beta_params_max).add_(self.beta_params_min)
         )
-        alphas = self.beta_params_max * torch.sigmoid(alphas) + self.beta_params_min
-        betas = self._get_policy_betas_beta(policy_outputs).reshape(
-            -1, self.n_dim, self.n_comp
+        betas = (
+            torch.sigmoid(betas).mul(self.beta_params_max).add_(self.beta_params_min)
         )
-        betas = self.beta_params_max * torch.sigmoid(betas) + self.beta_params_min
+        if self.n_comp == 1:
+            return Beta(alphas.squeeze(-1), betas.squeeze(-1))
+        mix = Categorical(logits=mix_logits)
         beta_distr = Beta(alphas, betas)
         return MixtureSameFamily(mix, beta_distr)
 
@@ -741,7 +754,7 @@ class ContinuousCube(CubeBase):
         self,
         policy_outputs: TensorType["n_states", "policy_output_dim"],
         mask: Optional[TensorType["n_states", "mask_dim"]] = None,
-        states_from: List = None,
+        states_from: Union[List, TensorType["n_states", "n_dim"]] = None,
         is_backward: Optional[bool] = False,
         sampling_method: Optional[str] = "policy",
         temperature_logits: Optional[float] = 1.0,
@@ -763,7 +776,7 @@ class ContinuousCube(CubeBase):
         self,
         policy_outputs: TensorType["n_states", "policy_output_dim"],
         mask: Optional[TensorType["n_states", "mask_dim"]] = None,
-        states_from: List = None,
+        states_from: Union[List, TensorType["n_states", "n_dim"]] = None,
         sampling_method: Optional[str] = "policy",
         temperature_logits: Optional[float] = 1.0,
         max_sampling_attempts: Optional[int] = 10,
@@ -809,66 +822,66 @@ class ContinuousCube(CubeBase):
             states_from, float_type=self.float, device=self.device
         )
         is_eos = torch.zeros(n_states, dtype=torch.bool, device=self.device)
+        # Unpack the columns of the mask (see get_mask_invalid_actions_forward())
+        mask_cont, mask_special, _ = mask[:, : self.mask_dim_base].unbind(dim=1)
         # Determine source states
-        is_source = ~mask[:, 1]
+        is_source = ~mask_special
         # EOS is the only possible action if continuous actions are invalid (mask[0] is
         # True)
-        is_eos_forced = mask[:, 0]
+        is_eos_forced = mask_cont
         is_eos[is_eos_forced] = True
         # Ensure that is_eos_forced does not include any source state
         assert not torch.any(torch.logical_and(is_source, is_eos_forced))
         # Sample EOS from Bernoulli distribution
-        do_eos = torch.logical_and(~is_source, ~is_eos_forced)
-        if torch.any(do_eos):
-            is_eos_sampled = torch.zeros_like(do_eos)
-            logits_eos = self._get_policy_eos_logit(policy_outputs)[do_eos]
-            distr_eos = Bernoulli(logits=logits_eos)
-            is_eos_sampled[do_eos] = tbool(distr_eos.sample(), device=self.device)
-            is_eos[is_eos_sampled] = True
-        # Sample (relative) increments if EOS is not the (sampled or forced) action
-        do_increments = ~is_eos
-        if torch.any(do_increments):
+        do_eos = ~(is_source | is_eos_forced)
+        # Equivalent to sampling from Bernoulli(logits=logits_eos), without building
+        # the distribution. An empty selection needs no guard.
+        logits_eos = self._get_policy_eos_logit(policy_outputs)[do_eos]
+        is_eos[do_eos] = torch.rand_like(logits_eos) < torch.sigmoid(logits_eos)
+        # Build actions
+        actions_tensor = torch.full(
+            (n_states, self.n_dim + 1), torch.inf, dtype=self.float, device=self.device
+        )
+        # Sample (relative) increments if EOS is not the (sampled or forced) action.
+        # The distribution cannot be built from an empty batch, so this is the only
+        # branch that needs to check the selection. The indices of the selected
+        # states are computed once and shared by all the gathers and writes below,
+        # and their number is known without a further sync.
+        idx_increments = torch.nonzero(~is_eos, as_tuple=True)[0]
+        if len(idx_increments) > 0:
             if sampling_method == "uniform":
                 raise NotImplementedError()
             elif sampling_method == "policy":
                 distr_increments = self._make_increments_distribution(
-                    policy_outputs[do_increments]
+                    policy_outputs.index_select(0, idx_increments)
                 )
             # Shape of increments: [n_do_increments, n_dim]
             increments = distr_increments.sample()
             # Compute absolute increments from sampled relative increments if state is
             # not source
-            is_relative = ~is_source[do_increments]
-            states_from_rel = tfloat(
-                states_from_tensor[do_increments],
-                float_type=self.float,
-                device=self.device,
-            )[is_relative]
+            is_relative = ~is_source[idx_increments]
+            states_from_rel = states_from_tensor[idx_increments[is_relative]]
             increments[is_relative] = self.relative_to_absolute_increments(
                 states_from_rel,
                 increments[is_relative],
                 is_backward=False,
             )
-        # Build actions
-        actions_tensor = torch.full(
-            (n_states, self.n_dim + 1), torch.inf, dtype=self.float, device=self.device
-        )
-        if torch.any(do_increments):
             # Make increments of ignored dimensions zero
-            increments = self._mask_ignored_dimensions(mask[do_increments], increments)
-            # Add dimension is_source and add to actions tensor
-            actions_tensor[do_increments] = torch.cat(
-                (increments, torch.zeros((increments.shape[0], 1))), dim=1
+            increments = self._mask_ignored_dimensions(
+                mask.index_select(0, idx_increments), increments
             )
+            # Add increments and dimension is_source (0) to actions tensor
+            actions_tensor[idx_increments, :-1] = increments
+            actions_tensor[idx_increments, -1] = 0.0
         actions_tensor[is_source, -1] = 1
-        actions = [tuple(a.tolist()) for a in actions_tensor]
+        actions = [tuple(a) for a in actions_tensor.tolist()]
         return actions, None
 
     def _sample_actions_batch_backward(
         self,
         policy_outputs: TensorType["n_states", "policy_output_dim"],
         mask: Optional[TensorType["n_states", "mask_dim"]] = None,
-        states_from: List = None,
+        states_from: Union[List, TensorType["n_states", "n_dim"]] = None,
         sampling_method: Optional[str] = "policy",
         temperature_logits: Optional[float] = 1.0,
         max_sampling_attempts: Optional[int] = 10,
@@ -902,68 +915,58 @@ class ContinuousCube(CubeBase):
         """
         # Initialize variables
         n_states = policy_outputs.shape[0]
+        states_from_tensor = tfloat(
+            states_from, float_type=self.float, device=self.device
+        )
         is_bts = torch.zeros(n_states, dtype=torch.bool, device=self.device)
+        # Unpack the columns of the mask (see get_mask_invalid_actions_backward())
+        _, mask_special, mask_eos = mask[:, : self.mask_dim_base].unbind(dim=1)
         # EOS is the only possible action only if done is True (mask[2] is False)
-        is_eos = ~mask[:, 2]
+        is_eos = ~mask_eos
         # Back-to-source (BTS) is the only possible action if mask[1] is False
-        is_bts_forced = ~mask[:, 1]
+        is_bts_forced = ~mask_special
         is_bts[is_bts_forced] = True
         # Sample BTS from Bernoulli distribution
-        do_bts = torch.logical_and(~is_bts_forced, ~is_eos)
-        if torch.any(do_bts):
-            is_bts_sampled = torch.zeros_like(do_bts)
-            logits_bts = self._get_policy_source_logit(policy_outputs)[do_bts]
-            distr_bts = Bernoulli(logits=logits_bts)
-            is_bts_sampled[do_bts] = tbool(distr_bts.sample(), device=self.device)
-            is_bts[is_bts_sampled] = True
+        do_bts = ~(is_bts_forced | is_eos)
+        # Equivalent to sampling from Bernoulli(logits=logits_bts), without building
+        # the distribution
+        logits_bts = self._get_policy_source_logit(policy_outputs)[do_bts]
+        is_bts[do_bts] = torch.rand_like(logits_bts) < torch.sigmoid(logits_bts)
+        # Build actions
+        actions_tensor = torch.zeros(
+            (n_states, self.n_dim + 1), dtype=self.float, device=self.device
+        )
+        actions_tensor[is_eos] = self.eos_tensor
         # Sample relative increments if actions are neither BTS nor EOS
-        do_increments = torch.logical_and(~is_bts, ~is_eos)
-        if torch.any(do_increments):
+        idx_increments = torch.nonzero(~(is_bts | is_eos), as_tuple=True)[0]
+        if len(idx_increments) > 0:
             if sampling_method == "uniform":
                 raise NotImplementedError()
             elif sampling_method == "policy":
                 distr_increments = self._make_increments_distribution(
-                    policy_outputs[do_increments]
+                    policy_outputs.index_select(0, idx_increments)
                 )
             # Shape of increments_rel: [n_do_increments, n_dim]
             increments = distr_increments.sample()
             # Compute absolute increments from all sampled relative increments
-            states_from_rel = tfloat(
-                states_from, float_type=self.float, device=self.device
-            )[do_increments]
             increments = self.relative_to_absolute_increments(
-                states_from_rel,
+                states_from_tensor.index_select(0, idx_increments),
                 increments,
                 is_backward=True,
             )
-        # Build actions
-        actions_tensor = torch.zeros(
-            (n_states, self.n_dim + 1), dtype=self.float, device=self.device
-        )
-        actions_tensor[is_eos] = tfloat(
-            self.eos, float_type=self.float, device=self.device
-        )
-        if torch.any(do_increments):
             # Make increments of ignored dimensions zero
-            increments = self._mask_ignored_dimensions(mask[do_increments], increments)
-            # Add dimension is_source and add to actions tensor
-            actions_tensor[do_increments] = torch.cat(
-                (increments, torch.zeros((increments.shape[0], 1))), dim=1
-            )
-        if torch.any(is_bts):
-            # BTS actions are equal to the originating states
-            actions_bts = tfloat(
-                states_from, float_type=self.float, device=self.device
-            )[is_bts]
-            actions_bts = torch.cat(
-                (actions_bts, torch.ones((actions_bts.shape[0], 1))), dim=1
-            )
-            actions_tensor[is_bts] = actions_bts
-            # Make ignored dimensions zero
-            actions_tensor[is_bts, :-1] = self._mask_ignored_dimensions(
-                mask[is_bts], actions_tensor[is_bts, :-1]
+            increments = self._mask_ignored_dimensions(
+                mask.index_select(0, idx_increments), increments
             )
-        actions = [tuple(a.tolist()) for a in actions_tensor]
+            # Add increments to actions tensor. Dimension is_source is already 0.
+            actions_tensor[idx_increments, :-1] = increments
+        # BTS actions are equal to the originating states, with dimension is_source 1,
+        # and ignored dimensions zero
+        actions_tensor[is_bts, :-1] = self._mask_ignored_dimensions(
+            mask[is_bts], states_from_tensor[is_bts]
+        )
+        actions_tensor[is_bts, -1] = 1.0
+        actions = [tuple(a) for a in actions_tensor.tolist()]
         return actions, None
 
     def get_logprobs(
@@ -971,7 +974,7 @@ class ContinuousCube(CubeBase):
         policy_outputs: TensorType["n_states", "policy_output_dim"],
         actions: TensorType["n_states", "actions_dim"],
         mask: TensorType["n_states", "mask_dim"],
-        states_from: List,
+        states_from: Union[List, TensorType["n_states", "n_dim"]],
         is_backward: bool,
     ) -> TensorType["batch_size"]:
         """
@@ -989,9 +992,11 @@ class ContinuousCube(CubeBase):
             The actions (absolute increments) from each state in the batch for which to
             compute the log probability.
 
-        states_from : tensor
+        states_from : list or tensor
             The states originating the actions, in GFlowNet format. They are required
-            so as to compute the relative increments and the Jacobian.
+            so as to compute the relative increments and the Jacobian. If a tensor with
+            the float type and device of the environment is passed, it is used
+            without copying it.
 
         is_backward : bool
             True if the actions are backward, False if the actions are forward
@@ -1012,7 +1017,7 @@ class ContinuousCube(CubeBase):
         policy_outputs: TensorType["n_states", "policy_output_dim"],
         actions: TensorType["n_states", "actions_dim"],
         mask: TensorType["n_states", "3"],
-        states_from: List,
+        states_from: Union[List, TensorType["n_states", "n_dim"]],
     ) -> TensorType["batch_size"]:
         """
         Computes log probabilities of forward actions.
@@ -1030,26 +1035,28 @@ class ContinuousCube(CubeBase):
         log_jacobian_diag = torch.zeros(
             (n_states, self.n_dim), device=self.device, dtype=self.float
         )
-        eos_tensor = tfloat(self.eos, float_type=self.float, device=self.device)
+        # Unpack the columns of the mask (see get_mask_invalid_actions_forward())
+        mask_cont, mask_special, _ = mask[:, : self.mask_dim_base].unbind(dim=1)
         # Determine source states
-        is_source = ~mask[:, 1]
+        is_source = ~mask_special
         # EOS is the only possible action if continuous actions are invalid (mask[0] is
         # True)
-        is_eos_forced = mask[:, 0]
+        is_eos_forced = mask_cont
         is_eos[is_eos_forced] = True
         # Ensure that is_eos_forced does not include any source state
         assert not torch.any(torch.logical_and(is_source, is_eos_forced))
         # Get sampled EOS actions and get log probs from Bernoulli distribution
-        do_eos = torch.logical_and(~is_source, ~is_eos_forced)
-        if torch.any(do_eos):
-            is_eos_sampled = torch.zeros_like(do_eos)
-            is_eos_sampled[do_eos] = torch.all(actions[do_eos] == eos_tensor, dim=1)
-            is_eos[is_eos_sampled] = True
-            logits_eos = self._get_policy_eos_logit(policy_outputs)[do_eos]
-            distr_eos = Bernoulli(logits=logits_eos)
-            logprobs_eos[do_eos] = distr_eos.log_prob(
-                is_eos_sampled[do_eos].to(self.float)
-            )
+        do_eos = ~(is_source | is_eos_forced)
+        # is_eos is False for all states in do_eos, so the sampled EOS actions can be
+        # written directly
+        is_eos_sampled = torch.all(actions[do_eos] == self.eos_tensor, dim=1)
+        is_eos[do_eos] = is_eos_sampled
+        # The log probability of a Bernoulli(logits=logits_eos) sample is the negative
+        # binary cross-entropy with logits, computed without building a distribution
+        logits_eos = self._get_policy_eos_logit(policy_outputs)[do_eos]
+        logprobs_eos[do_eos] = -F.binary_cross_entropy_with_logits(
+            logits_eos, is_eos_sampled.to(self.float), reduction="none"
+        )
         # Get log probs of relative increments if EOS was not the sampled or forced
         # action
         do_increments = ~is_eos
@@ -1061,36 +1068,29 @@ class ContinuousCube(CubeBase):
             # Compute relative increments from absolute increments if state is not
             # source
             is_relative = ~is_source[do_increments]
-            if torch.any(is_relative):
-                states_from_rel = tfloat(
-                    states_from_tensor[do_increments],
-                    float_type=self.float,
-                    device=self.device,
-                )[is_relative]
-                increments[is_relative] = self.absolute_to_relative_increments(
-                    states_from_rel,
-                    increments[is_relative],
-                    is_backward=False,
-                )
-            # Compute diagonal of the Jacobian (see _get_jacobian_diag()) if state is
-            # not source
-            is_relative = torch.logical_and(do_increments, ~is_source)
-            if torch.any(is_relative):
-                log_jacobian_diag[is_relative] = torch.log(
-                    self._get_jacobian_diag(
-                        states_from_rel,
-                        is_backward=False,
-                    )
-                )
+            states_from_rel = states_from_tensor[do_increments][is_relative]
+            increments[is_relative] = self.absolute_to_relative_increments(
+                states_from_rel,
+                increments[is_relative],
+                is_backward=False,
+            )
+            # Compute log of the diagonal of the Jacobian (see
+            # _get_log_jacobian_diag()) if state is not source
+            is_relative = ~(is_eos | is_source)
+            log_jacobian_diag[is_relative] = self._get_log_jacobian_diag(
+                states_from_rel,
+                is_backward=False,
+            )
             # Make ignored dimensions zero
             log_jacobian_diag = self._mask_ignored_dimensions(mask, log_jacobian_diag)
             # Get logprobs
             distr_increments = self._make_increments_distribution(
                 policy_outputs[do_increments]
             )
-            # Clamp because increments of 0.0 or 1.0 would yield nan
+            # Clamp because increments of 0.0 or 1.0 would yield nan. increments is
+            # not needed afterwards, so it is clamped in place.
             logprobs_increments_rel[do_increments] = distr_increments.log_prob(
-                torch.clamp(increments, min=self.epsilon, max=(1 - self.epsilon))
+                increments.clamp_(min=self.epsilon, max=(1 - self.epsilon))
             )
             # Make ignored dimensions zero
             logprobs_increments_rel = self._mask_ignored_dimensions(
@@ -1100,7 +1100,8 @@ class ContinuousCube(CubeBase):
         log_det_jacobian = torch.sum(log_jacobian_diag, dim=1)
         # Compute combined probabilities
         sumlogprobs_increments = logprobs_increments_rel.sum(axis=1)
-        logprobs = logprobs_eos + sumlogprobs_increments + log_det_jacobian
+        # The sum is accumulated in place on logprobs_eos, which is not used otherwise
+        logprobs = logprobs_eos.add_(sumlogprobs_increments).add_(log_det_jacobian)
         return logprobs
 
     def _get_logprobs_backward(
@@ -1108,7 +1109,7 @@ class ContinuousCube(CubeBase):
         policy_outputs: TensorType["n_states", "policy_output_dim"],
         actions: TensorType["n_states", "actions_dim"],
         mask: TensorType["n_states", "3"],
-        states_from: List,
+        states_from: Union[List, TensorType["n_states", "n_dim"]],
     ) -> TensorType["batch_size"]:
         """
         Computes log probabilities of backward actions.
@@ -1126,27 +1127,26 @@ class ContinuousCube(CubeBase):
         log_jacobian_diag = torch.zeros(
             (n_states, self.n_dim), device=self.device, dtype=self.float
         )
+        # Unpack the columns of the mask (see get_mask_invalid_actions_backward())
+        _, mask_special, mask_eos = mask[:, : self.mask_dim_base].unbind(dim=1)
         # EOS is the only possible action only if done is True (mask[2] is False)
-        is_eos = ~mask[:, 2]
+        is_eos = ~mask_eos
         # Back-to-source (BTS) is the only possible action if mask[1] is False
-        is_bts_forced = ~mask[:, 1]
+        is_bts_forced = ~mask_special
         is_bts[is_bts_forced] = True
         # Get sampled BTS actions and get log probs from Bernoulli distribution
-        do_bts = torch.logical_and(~is_bts_forced, ~is_eos)
-        if torch.any(do_bts):
-            # BTS actions are equal to the originating states
-            is_bts_sampled = torch.zeros_like(do_bts)
-            is_bts_sampled[do_bts] = torch.all(
-                actions[do_bts, :-1] == states_from_tensor[do_bts], dim=1
-            )
-            is_bts[is_bts_sampled] = True
-            logits_bts = self._get_policy_source_logit(policy_outputs)[do_bts]
-            distr_bts = Bernoulli(logits=logits_bts)
-            logprobs_bts[do_bts] = distr_bts.log_prob(
-                is_bts_sampled[do_bts].to(self.float)
-            )
+        do_bts = ~(is_bts_forced | is_eos)
+        # BTS actions are equal to the originating states
+        is_bts_sampled = torch.all(
+            actions[do_bts, :-1] == states_from_tensor[do_bts], dim=1
+        )
+        is_bts[do_bts] = is_bts_sampled
+        logits_bts = self._get_policy_source_logit(policy_outputs)[do_bts]
+        logprobs_bts[do_bts] = -F.binary_cross_entropy_with_logits(
+            logits_bts, is_bts_sampled.to(self.float), reduction="none"
+        )
         # Get log probs of relative increments if actions were neither BTS nor EOS
-        do_increments = torch.logical_and(~is_bts, ~is_eos)
+        do_increments = ~(is_bts | is_eos)
         if torch.any(do_increments):
             # Get absolute increments
             increments = actions[do_increments, :-1]
@@ -1158,12 +1158,11 @@ class ContinuousCube(CubeBase):
             )
             # Make sure increments are finite
             assert torch.all(torch.isfinite(increments))
-            # Compute diagonal of the Jacobian (see _get_jacobian_diag())
-            log_jacobian_diag[do_increments] = torch.log(
-                self._get_jacobian_diag(
-                    states_from_tensor[do_increments],
-                    is_backward=True,
-                )
+            # Compute log of the diagonal of the Jacobian (see
+            # _get_log_jacobian_diag())
+            log_jacobian_diag[do_increments] = self._get_log_jacobian_diag(
+                states_from_tensor[do_increments],
+                is_backward=True,
             )
             # Make ignored dimensions zero
             log_jacobian_diag = self._mask_ignored_dimensions(mask, log_jacobian_diag)
@@ -1171,9 +1170,9 @@ class ContinuousCube(CubeBase):
             distr_increments = self._make_increments_distribution(
                 policy_outputs[do_increments]
             )
-            # Clamp because increments of 0.0 or 1.0 would yield nan
+            # Clamp (in place) because increments of 0.0 or 1.0 would yield nan
             logprobs_increments_rel[do_increments] = distr_increments.log_prob(
-                torch.clamp(increments, min=self.epsilon, max=(1 - self.epsilon))
+                increments.clamp_(min=self.epsilon, max=(1 - self.epsilon))
             )
             # Make ignored dimensions zero
             logprobs_increments_rel = self._mask_ignored_dimensions(
@@ -1183,19 +1182,18 @@ class ContinuousCube(CubeBase):
         log_det_jacobian = torch.sum(log_jacobian_diag, dim=1)
         # Compute combined probabilities
         sumlogprobs_increments = logprobs_increments_rel.sum(axis=1)
-        logprobs = logprobs_bts + sumlogprobs_increments + log_det_jacobian
+        logprobs = logprobs_bts.add_(sumlogprobs_increments).add_(log_det_jacobian)
         # Ensure that logprobs of forced EOS are 0
-        logprobs[is_eos] = 0.0
-        return logprobs
+        return logprobs.masked_fill_(is_eos, 0.0)
 
-    def _get_jacobian_diag(
+    def _get_log_jacobian_diag(
         self,
         states_from: TensorType["n_states", "n_dim"],
         is_backward: bool,
     ):
         """
-        Computes the diagonal of the Jacobian of the sampled actions with respect to
-        the target states.
+        Computes the log of the diagonal of the Jacobian of the sampled actions with
+        respect to the target states.
 
         Forward: the sampled variables are the relative increments r_f and the state
         updates (s -> s') are:
@@ -1222,14 +1220,14 @@ class ContinuousCube(CubeBase):
         The derivatives of the components of r with respect to dimensions of s or s'
         other than itself are zero. Therefore, the Jacobian is diagonal and the
         determinant is the product of the diagonal.
+
+        The log of the diagonal is computed directly as -log(s' - m) or -log(1 - s -
+        m), rather than as the log of the reciprocal.
         """
-        min_increments = torch.full_like(
-            states_from, self.min_incr, dtype=self.float, device=self.device
-        )
         if is_backward:
-            return 1.0 / ((states_from - min_increments))
+            return -torch.log(states_from - self.min_incr)
         else:
-            return 1.0 / ((1.0 - states_from - min_increments))
+            return -torch.log(1.0 - states_from - self.min_incr)
 
     def _step(
         self,
@@ -1263,28 +1261,24 @@ class ContinuousCube(CubeBase):
         """
         # If forward action is from source, initialize state to all zeros.
         if not backward and action[-1] == 1 and self.state == self.source:
-            state = [0.0 for _ in range(self.n_dim)]
+            state = [0.0] * self.n_dim
         else:
             assert action[-1] == 0
-            state = copy(self.state)
-        # Increment dimensions
-        for dim, incr in enumerate(action[:-1]):
-            if backward:
-                state[dim] -= incr
-            else:
-                state[dim] += incr
+            state = self.state
+        # Increment dimensions. A new list is built, so self.state is not modified
+        # if the action turns out to be invalid.
+        if backward:
+            state = [s - incr for s, incr in zip(state, action[:-1])]
+        else:
+            state = [s + incr for s, incr in zip(state, action[:-1])]
 
         # If state is out of bounds, return invalid
         effective_dims = self._get_effective_dims(state)
-        if any([s > 1.0 for s in effective_dims]) or any(
-            [s < 0.0 for s in effective_dims]
-        ):
-            warnings.warn(
-                f"""
+        if any(s > 1.0 or s < 0.0 for s in effective_dims):
+            warnings.warn(f"""
                 State is out of cube bounds.
                 \nCurrent state:\n{self.state}\nAction:\n{action}\nNext state: {state}
-                """
-            )
+                """)
             return self.state, action, False
 
         # Otherwise, set self.state as the udpated state and return valid.
@@ -1401,9 +1395,10 @@ class ContinuousCube(CubeBase):
         linspaces = [
             np.linspace(kappa, 1.0 - kappa, n_per_dim) for _ in range(self.n_dim)
         ]
-        states = list(itertools.product(*linspaces))
-        states = [list(el) for el in states]
-        return states
+        # Stacking the "ij" mesh grid yields the states in the same order as
+        # itertools.product(*linspaces)
+        states = np.stack(np.meshgrid(*linspaces, indexing="ij"), axis=-1)
+        return states.reshape(-1, self.n_dim).tolist()
 
     def get_uniform_terminating_states(
         self, n_states: int, seed: int = None, kappa: Optional[float] = None
@@ -619,6 +619,9 @@ def extend(
     return orig
 
 
+_IMMUTABLE_SCALAR_TYPES = frozenset((int, float, bool, str))
+
+
 def copy(x: Union[List, TensorType["..."]]):
     """
     Makes copy of the input tensor or list.
@@ -637,8 +640,11 @@ def copy(x: Union[List, TensorType["..."]]):
     """
     if torch.is_tensor(x):
         return x.clone().detach()
-    else:
-        return deepcopy(x)
+    # For a flat list of immutable scalars, as most states are, a shallow copy is
+    # equivalent to a deep copy and much cheaper
+    if isinstance(x, list) and all(type(el) in _IMMUTABLE_SCALAR_TYPES for el in x):
+        return x.copy()
+    return deepcopy(x)
 
 
 def bootstrap_samples(tensor, num_samples):
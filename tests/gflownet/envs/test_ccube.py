@@ -2,7 +2,7 @@ import common
 import numpy as np
 import pytest
 import torch
-from torch.distributions import Bernoulli, Beta
+from torch.distributions import Bernoulli, Beta, Categorical, MixtureSameFamily
 
 from gflownet.envs.cube import ContinuousCube
 from gflownet.utils.common import tbool, tfloat
@@ -363,6 +363,30 @@ def test__relative_to_absolute_increments__2d_backward__returns_expected(
     assert torch.all(torch.isclose(states_next, states_expected))
 
 
+@pytest.mark.parametrize("n_dim", [1, 2, 3])
+def test__make_increments_distribution__single_component_matches_mixture(n_dim):
+    env = ContinuousCube(n_dim=n_dim, n_comp=1, min_incr=0.1)
+    policy_outputs = torch.randn(
+        (10, env.policy_output_dim), dtype=env.float, device=env.device
+    )
+    distr_increments = env._make_increments_distribution(policy_outputs)
+    # Build the equivalent mixture of a single Beta distribution
+    mix_logits = env._get_policy_betas_weights(policy_outputs).reshape(-1, n_dim, 1)
+    alphas = env._get_policy_betas_alpha(policy_outputs).reshape(-1, n_dim, 1)
+    betas = env._get_policy_betas_beta(policy_outputs).reshape(-1, n_dim, 1)
+    alphas = env.beta_params_max * torch.sigmoid(alphas) + env.beta_params_min
+    betas = env.beta_params_max * torch.sigmoid(betas) + env.beta_params_min
+    distr_mixture = MixtureSameFamily(
+        Categorical(logits=mix_logits), Beta(alphas, betas)
+    )
+    increments = torch.rand((10, n_dim), dtype=env.float, device=env.device)
+    increments = torch.clamp(increments, min=env.epsilon, max=1 - env.epsilon)
+    assert distr_increments.sample().shape == (10, n_dim)
+    assert torch.allclose(
+        distr_increments.log_prob(increments), distr_mixture.log_prob(increments)
+    )
+
+
 @pytest.mark.parametrize(
     "state, action, state_expected",
     [
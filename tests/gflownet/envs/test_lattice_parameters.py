@@ -164,6 +164,29 @@ def test__triclinic__constraints_remain_after_random_actions(env, lattice_system
         assert len({alpha, beta, gamma, 90.0}) == 4
 
 
+@pytest.mark.parametrize(
+    "lattice_system, new_lattice_system",
+    [
+        (CUBIC, RHOMBOHEDRAL),
+        (HEXAGONAL, TRICLINIC),
+        (TRICLINIC, HEXAGONAL),
+    ],
+)
+def test__set_lattice_system__unpacks_parameters_of_new_system(
+    env, lattice_system, new_lattice_system
+):
+    env.set_lattice_system(new_lattice_system)
+    state = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+    expected = LatticeParameters(
+        lattice_system=new_lattice_system,
+        min_length=1.0,
+        max_length=5.0,
+        min_angle=30.0,
+        max_angle=150.0,
+    )._unpack_lengths_angles(state)
+    assert env._unpack_lengths_angles(state) == expected
+
+
 @pytest.mark.parametrize(
     "lattice_system, states, expected",
     [
@@ -378,6 +378,38 @@ def test__special_cases_composition_compatibility(n_atoms, cls_idx, ps_idx):
     assert valid is False
 
 
+@pytest.mark.parametrize(
+    "state",
+    [
+        [0, 0, 0],
+        [1, 0, 0],
+        [0, 2, 0],
+        [4, 2, 0],
+    ],
+)
+def test__mask_conditioning__invalidates_actions_invalid_in_env_cond(
+    env, env_with_restricted_spacegroups, state
+):
+    env.set_state(state, False)
+    mask = env.get_mask_invalid_actions_forward()
+    mask_cond = env.mask_conditioning(
+        mask, env_with_restricted_spacegroups, backward=False
+    )
+    actions_valid_cond = env_with_restricted_spacegroups.get_valid_actions()
+    for action, m, m_cond in zip(env.action_space, mask, mask_cond):
+        assert m_cond is (m or action not in actions_valid_cond)
+
+
+def test__set_n_atoms_compatibility_dict__updates_mask_forward(env):
+    action_cls_5_from_0 = (0, 5, 0)
+    mask = env.get_mask_invalid_actions_forward([0, 0, 0], False)
+    assert mask[env.action_space.index(action_cls_5_from_0)] is False
+    # Crystal-lattice system 5 is not compatible with a single atom
+    env.set_n_atoms_compatibility_dict([1])
+    mask = env.get_mask_invalid_actions_forward([0, 0, 0], False)
+    assert mask[env.action_space.index(action_cls_5_from_0)] is True
+
+
 @pytest.mark.parametrize(
     "state",
     [